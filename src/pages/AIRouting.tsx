@@ -201,28 +201,36 @@ const AIRouting: React.FC = () => {
       const distanceMiles = routeData?.distanceMiles || 0;
 
       if (optimizedJobs.length > 0) {
-        const updatedPrediction = { ...prediction };
-        const updatedStops = stops.map(stop => {
-          const opt = optimizedJobs.find(j => j.orderId === stop.order_id && 
-            (j.type === 'collection' ? 'collection' : 'delivery') === stop.type);
-          if (opt) {
-            return {
-              ...stop,
-              sequenceOrder: opt.sequenceOrder,
-              estimatedArrivalTime: opt.estimatedArrivalTime,
-            };
-          }
-          return stop;
-        }).sort((a, b) => (a.sequenceOrder || 99) - (b.sequenceOrder || 99));
-
-        updatedPrediction.routes_by_day = {
-          ...updatedPrediction.routes_by_day,
-          [day]: {
-            ...updatedPrediction.routes_by_day[day],
-            [driverSlot.toString()]: updatedStops,
-          },
-        };
-        setPrediction(updatedPrediction);
+        // Functional update so concurrent per-slot optimizations don't
+        // clobber each other's results
+        setPrediction(prev => {
+          if (!prev) return prev;
+          const prevStops = prev.routes_by_day[day]?.[driverSlot.toString()];
+          if (!prevStops) return prev;
+          const updatedStops = prevStops.map(stop => {
+            const opt = optimizedJobs.find(j => j.orderId === stop.order_id &&
+              (j.type === 'collection' ? 'collection' : 'delivery') === stop.type);
+            if (opt) {
+              return {
+                ...stop,
+                sequenceOrder: opt.sequenceOrder,
+                estimatedArrivalTime: opt.estimatedArrivalTime,
+              };
+            }
+            return stop;
+          }).sort((a, b) => (a.sequenceOrder || 99) - (b.sequenceOrder || 99));
+
+          return {
+            ...prev,
+            routes_by_day: {
+              ...prev.routes_by_day,
+              [day]: {
+                ...prev.routes_by_day[day],
+                [driverSlot.toString()]: updatedStops,
+              },
+            },
+          };
+        });
         setRouteMileage(prev => new Map(prev).set(key, distanceMiles));
         toast.success(`Route optimized for Driver Slot ${driverSlot}`);
       }
@@ -242,9 +250,9 @@ const AIRouting: React.FC = () => {
   const handleOptimizeAll = useCallback(async (day: string) => {
     if (!prediction) return;
     const slots = Object.keys(prediction.routes_by_day[day] || {});
-    for (const slot of slots) {
-      await handleOptimizeRoute(day, parseInt(slot));
-    }
+    // Each slot is an independent solve, so run them concurrently — the
+    // day's wall time becomes the slowest route instead of the sum
+    await Promise.all(slots.map(slot => handleOptimizeRoute(day, parseInt(slot))));
   }, [prediction, handleOptimizeRoute]);
 
   // Build comparison scenarios
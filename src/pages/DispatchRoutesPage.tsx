@@ -249,20 +249,22 @@ export default function DispatchRoutesPage() {
       if (seq.length === 0) throw new Error("No sequence returned");
 
       const sb = supabase as any;
-      // Two-phase update to avoid unique conflicts on (route_id, sequence) if any
+      // Two-phase update to avoid unique conflicts on (route_id, sequence) if any.
+      // Rows within a phase are independent, so fire each phase as one batch
+      // instead of a round-trip per stop.
       const tempBase = 10000;
-      for (const s of seq) {
+      await Promise.all(seq.map(async (s) => {
         const { error: e1 } = await sb.from("dispatch_route_stops")
           .update({ sequence: tempBase + s.sequence })
           .eq("id", s.stop_id);
         if (e1) throw e1;
-      }
-      for (const s of seq) {
+      }));
+      await Promise.all(seq.map(async (s) => {
         const { error: e2 } = await sb.from("dispatch_route_stops")
           .update({ sequence: s.sequence })
           .eq("id", s.stop_id);
         if (e2) throw e2;
-      }
+      }));
       await sb.from("dispatch_routes").update({
         total_distance_km: data.total_distance_km ?? null,
         total_duration_min: data.total_duration_min ?? null,
@@ -139,6 +139,11 @@ export const optimizeMultiDriverRoute = async (
   // Parse results and group by driver
   const driverRoutes = new Map<number, { jobs: OptimizedJob[], distanceMiles: number }>();
 
+  // Index shipments and jobs once so step parsing is O(steps) rather than
+  // a linear scan per step
+  const metadataByShipmentId = new Map(shipments.map(s => [s.id, s.metadata]));
+  const jobByKey = new Map(jobs.map(j => [`${j.orderId}:${j.type}`, j]));
+
   data.features.forEach((route: any, routeIndex: number) => {
     const steps = route.properties.steps;
     const distanceMeters = route.properties.distance || 0;
@@ -149,9 +154,8 @@ export const optimizeMultiDriverRoute = async (
     steps.forEach((step: any) => {
       if (step.type === 'start' || step.type === 'end') return;
 
-      const shipmentId = step.shipment_id;
-      const metadata = shipments.find(s => s.id === shipmentId)?.metadata;
-      
+      const metadata = metadataByShipmentId.get(step.shipment_id);
+
       if (!metadata) return;
 
       const arrivalTime = new Date(step.arrival_time);
@@ -164,9 +168,7 @@ export const optimizeMultiDriverRoute = async (
       const windowEnd = new Date(arrivalTime.getTime() + 3 * 60 * 60 * 1000);
       const timeslotWindow = `${arrivalTimeStr} to ${windowEnd.toTimeString().slice(0, 5)}`;
 
-      const originalJob = jobs.find(
-        j => j.orderId === metadata.orderId && j.type === metadata.jobType
-      );
+      const originalJob = jobByKey.get(`${metadata.orderId}:${metadata.jobType}`);
 
       if (originalJob) {
         optimizedJobs.push({
@@ -305,14 +307,18 @@ export const optimizeRouteWithGeoapify = async (
   const distanceMeters = route.properties.distance || 0;
   const distanceMiles = distanceMeters / 1609.34;
 
+  // Index shipments and jobs once so step parsing is O(steps) rather than
+  // a linear scan per step
+  const metadataByShipmentId = new Map(shipments.map(s => [s.id, s.metadata]));
+  const jobByKey = new Map(jobs.map(j => [`${j.orderId}:${j.type}`, j]));
+
   let sequenceCounter = 1; // Start from 1
 
   steps.forEach((step: any) => {
     if (step.type === 'start' || step.type === 'end') return;
 
-    const shipmentId = step.shipment_id;
-    const metadata = shipments.find(s => s.id === shipmentId)?.metadata;
-    
+    const metadata = metadataByShipmentId.get(step.shipment_id);
+
     if (!metadata) return;
 
     const arrivalTime = new Date(step.arrival_time);
@@ -325,9 +331,7 @@ export const optimizeRouteWithGeoapify = async (
     const windowEnd = new Date(arrivalTime.getTime() + 3 * 60 * 60 * 1000);
     const timeslotWindow = `${arrivalTimeStr} to ${windowEnd.toTimeString().slice(0, 5)}`;
 
-    const originalJob = jobs.find(
-      j => j.orderId === metadata.orderId && j.type === metadata.jobType
-    );
+    const originalJob = jobByKey.get(`${metadata.orderId}:${metadata.jobType}`);
 
     if (originalJob) {
       optimizedJobs.push({
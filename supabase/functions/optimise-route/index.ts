@@ -13,6 +13,80 @@ interface Body {
 
 const GATEWAY_URL = 'https://connector-gateway.lovable.dev/google_maps';
 
+// Routes API limit: 25 origins x 25 destinations = 625 elements per computeRouteMatrix call
+const MATRIX_CHUNK = 25;
+
+// How many matrix block requests to keep in flight at once
+const MATRIX_CONCURRENCY = 8;
+
+// Sentinel for "no data" matrix entries — Int32Array cannot hold Infinity
+const UNREACHABLE = 0x3fffffff;
+
+// Pairs further apart than this straight-line distance are never adjacent in
+// a sensible day route, so they are estimated instead of fetched
+const FAR_PAIR_KM = 100;
+
+// Conservative road estimate for far pairs: straight line x 1.3 at 65 km/h
+const ROAD_FACTOR = 1.3;
+const AVG_SPEED_KMH = 65;
+
+function haversineKm(lat1: number, lon1: number, lat2: number, lon2: number): number {
+  const R = 6371;
+  const dLat = (lat2 - lat1) * Math.PI / 180;
+  const dLon = (lon2 - lon1) * Math.PI / 180;
+  const a = Math.sin(dLat / 2) ** 2 + Math.cos(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) * Math.sin(dLon / 2) ** 2;
+  return R * 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1 - a));
+}
+
+function bearingDeg(lat1: number, lon1: number, lat2: number, lon2: number): number {
+  const dLon = (lon2 - lon1) * Math.PI / 180;
+  const y = Math.sin(dLon) * Math.cos(lat2 * Math.PI / 180);
+  const x = Math.cos(lat1 * Math.PI / 180) * Math.sin(lat2 * Math.PI / 180) -
+    Math.sin(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) * Math.cos(dLon);
+  return ((Math.atan2(y, x) * 180 / Math.PI) + 360) % 360;
+}
+
+// Per-pair travel times cached across warm invocations of this isolate, so
+// repeat optimisations of an overlapping stop set (fixed depot + slowly
+// changing job list) skip the Routes API for pairs already seen. Oldest
+// entries are evicted first once the cap is hit.
+const PAIR_CACHE_MAX = 50_000;
+const pairCache = new Map<string, { dist: number; dur: number }>();
+
+const pairKey = (a: { lat: number; lon: number }, b: { lat: number; lon: number }) =>
+  `${a.lat},${a.lon}>${b.lat},${b.lon}`;
+
+function cachePair(key: string, entry: { dist: number; dur: number }) {
+  if (pairCache.has(key)) pairCache.delete(key);
+  pairCache.set(key, entry);
+  if (pairCache.size > PAIR_CACHE_MAX) {
+    pairCache.delete(pairCache.keys().next().value!);
+  }
+}
+
+// POST one matrix block, retrying 429/5xx with exponential backoff
+async function postMatrixBlock(headers: Record<string, string>, body: unknown): Promise<any[]> {
+  let resp: Response | null = null;
+  for (let attempt = 0; attempt < 4; attempt++) {
+    resp = await fetch(`${GATEWAY_URL}/routes/distanceMatrix/v2:computeRouteMatrix`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify(body),
+    });
+    if (resp.ok || (resp.status !== 429 && resp.status < 500)) break;
+    // Keep the last attempt's body readable for the error message below,
+    // and don't sleep when there are no retries left
+    if (attempt === 3) break;
+    await resp.body?.cancel();
+    await new Promise((r) => setTimeout(r, 500 * 2 ** attempt));
+  }
+  if (!resp || !resp.ok) {
+    const txt = resp ? await resp.text() : 'no response';
+    throw new Error(`Routes API failed: ${txt.slice(0, 500)}`);
+  }
+  return await resp.json();
+}
+
 Deno.serve(async (req) => {
   if (req.method === 'OPTIONS') return new Response('ok', { headers: corsHeaders });
 
@@ -35,93 +109,272 @@ Deno.serve(async (req) => {
     const stops = body.stops.filter((s) => Number.isFinite(s.lat) && Number.isFinite(s.lon));
     const origin = body.origin && Number.isFinite(body.origin.lat) ? body.origin : { lat: stops[0].lat, lon: stops[0].lon };
 
-    // Build matrix waypoints: origin + all stops
-    const points = [{ id: '__origin', lat: origin.lat, lon: origin.lon }, ...stops];
-
-    const matrixBody = {
-      origins: points.map((p) => ({
-        waypoint: { location: { latLng: { latitude: p.lat, longitude: p.lon } } },
-      })),
-      destinations: points.map((p) => ({
-        waypoint: { location: { latLng: { latitude: p.lat, longitude: p.lon } } },
-      })),
-      travelMode: 'DRIVE',
-      routingPreference: 'TRAFFIC_AWARE',
-    };
+    // For multi-block instances, sort stops into rough geographic clusters
+    // (45-degree bearing corridors from the origin, near-to-far) so that
+    // each 25x25 matrix block covers one area — the same corridor grouping
+    // predict-routes-v2 uses. Clustered blocks are far more likely to be
+    // fully cached or fully estimable and therefore skippable.
+    if (stops.length > MATRIX_CHUNK) {
+      stops.sort((s1, s2) => {
+        const b1 = Math.floor(bearingDeg(origin.lat, origin.lon, s1.lat, s1.lon) / 45);
+        const b2 = Math.floor(bearingDeg(origin.lat, origin.lon, s2.lat, s2.lon) / 45);
+        if (b1 !== b2) return b1 - b2;
+        return haversineKm(origin.lat, origin.lon, s1.lat, s1.lon) -
+          haversineKm(origin.lat, origin.lon, s2.lat, s2.lon);
+      });
+    }
 
-    const resp = await fetch(`${GATEWAY_URL}/routes/distanceMatrix/v2:computeRouteMatrix`, {
-      method: 'POST',
-      headers: {
-        'Authorization': `Bearer ${LOVABLE_API_KEY}`,
-        'X-Connection-Api-Key': GOOGLE_MAPS_API_KEY,
-        'Content-Type': 'application/json',
-        'X-Goog-FieldMask': 'originIndex,destinationIndex,duration,distanceMeters,status',
-      },
-      body: JSON.stringify(matrixBody),
+    // Build matrix waypoints: origin + unique stop coordinates. Stops that
+    // share an address (collection and delivery at the same shop are common)
+    // collapse onto one matrix row/column and are expanded back afterwards.
+    const points = [{ lat: origin.lat, lon: origin.lon }];
+    const stopIdsByPoint: string[][] = [[]];
+    const pointIndexByCoord = new Map<string, number>();
+    for (const s of stops) {
+      const key = `${s.lat},${s.lon}`;
+      let idx = pointIndexByCoord.get(key);
+      if (idx === undefined) {
+        idx = points.length;
+        pointIndexByCoord.set(key, idx);
+        points.push({ lat: s.lat, lon: s.lon });
+        stopIdsByPoint.push([]);
+      }
+      stopIdsByPoint[idx].push(s.id);
+    }
+
+    const n = points.length;
+    // Flat Int32 matrices indexed [i * n + j]: one contiguous 4-byte-per-entry
+    // buffer each instead of an array of boxed-number rows, so the solver's
+    // hot loops stay cache-friendly
+    const dist = new Int32Array(n * n).fill(UNREACHABLE);
+    const dur = new Int32Array(n * n).fill(UNREACHABLE);
+
+    const toWaypoint = (p: { lat: number; lon: number }) => ({
+      waypoint: { location: { latLng: { latitude: p.lat, longitude: p.lon } } },
     });
 
-    if (!resp.ok) {
-      const txt = await resp.text();
-      return new Response(JSON.stringify({ error: 'Routes API failed', detail: txt.slice(0, 500) }), {
+    const matrixHeaders = {
+      'Authorization': `Bearer ${LOVABLE_API_KEY}`,
+      'X-Connection-Api-Key': GOOGLE_MAPS_API_KEY,
+      'Content-Type': 'application/json',
+      'X-Goog-FieldMask': 'originIndex,destinationIndex,duration,distanceMeters,status',
+    };
+
+    // Pre-fill whatever the pair cache already knows
+    for (let i = 0; i < n; i++) {
+      for (let j = 0; j < n; j++) {
+        const hit = pairCache.get(pairKey(points[i], points[j]));
+        if (hit) {
+          dist[i * n + j] = hit.dist;
+          dur[i * n + j] = hit.dur;
+        }
+      }
+    }
+
+    // Far-field pairs only need to look expensive to the solver, not be
+    // exact: fill anything beyond FAR_PAIR_KM with a conservative road
+    // estimate so whole inter-cluster blocks can skip the Routes API.
+    // Estimates stay out of the pair cache so a later request can still
+    // fetch the real value if it ever needs it.
+    if (n > MATRIX_CHUNK) {
+      // Precompute per-point radians and cosines once so the O(n^2) pass
+      // below does two sines per pair instead of the full haversine trig
+      const latRad = new Float64Array(n);
+      const lonRad = new Float64Array(n);
+      const cosLat = new Float64Array(n);
+      for (let i = 0; i < n; i++) {
+        latRad[i] = points[i].lat * Math.PI / 180;
+        lonRad[i] = points[i].lon * Math.PI / 180;
+        cosLat[i] = Math.cos(latRad[i]);
+      }
+      for (let i = 0; i < n; i++) {
+        for (let j = 0; j < n; j++) {
+          if (i === j || dur[i * n + j] !== UNREACHABLE) continue;
+          const sLat = Math.sin((latRad[j] - latRad[i]) / 2);
+          const sLon = Math.sin((lonRad[j] - lonRad[i]) / 2);
+          const a = sLat * sLat + cosLat[i] * cosLat[j] * sLon * sLon;
+          const km = 6371 * 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1 - a));
+          if (km > FAR_PAIR_KM) {
+            dist[i * n + j] = Math.round(km * ROAD_FACTOR * 1000);
+            dur[i * n + j] = Math.round((km * ROAD_FACTOR / AVG_SPEED_KMH) * 3600);
+          }
+        }
+      }
+    }
+
+    // With SYMMETRIC_TIMES=true only the upper-triangle blocks are fetched
+    // and the lower triangle is mirrored, halving Routes API calls. Off by
+    // default because TRAFFIC_AWARE can produce small A->B / B->A asymmetries.
+    const symmetric = Deno.env.get('SYMMETRIC_TIMES') === 'true';
+
+    // Tile the full cross-product into <=25x25 blocks so any stop count fits
+    // within the Routes API per-request element limit; blocks fully covered
+    // by the cache are skipped entirely
+    const blocks: { oi: number; di: number }[] = [];
+    for (let oi = 0; oi < n; oi += MATRIX_CHUNK) {
+      for (let di = 0; di < n; di += MATRIX_CHUNK) {
+        if (symmetric && di < oi) continue;
+        let needed = false;
+        for (let i = oi; i < Math.min(oi + MATRIX_CHUNK, n) && !needed; i++) {
+          for (let j = di; j < Math.min(di + MATRIX_CHUNK, n); j++) {
+            if (dur[i * n + j] === UNREACHABLE) { needed = true; break; }
+          }
+        }
+        if (needed) blocks.push({ oi, di });
+      }
+    }
+
+    const fetchBlock = async ({ oi, di }: { oi: number; di: number }) => {
+      const rows = await postMatrixBlock(matrixHeaders, {
+        origins: points.slice(oi, oi + MATRIX_CHUNK).map(toWaypoint),
+        destinations: points.slice(di, di + MATRIX_CHUNK).map(toWaypoint),
+        travelMode: 'DRIVE',
+        routingPreference: 'TRAFFIC_AWARE',
+      });
+      for (const r of rows) {
+        const i = r.originIndex, j = r.destinationIndex;
+        if (typeof i !== 'number' || typeof j !== 'number') continue;
+        const at = (oi + i) * n + di + j;
+        // proto3 JSON omits zero-valued fields, so an element with a duration
+        // but no distanceMeters (or vice versa) is a real 0, not missing data;
+        // only an element with neither is unreachable
+        const hasDist = typeof r.distanceMeters === 'number';
+        const hasDur = typeof r.duration === 'string'; // duration is "123s"
+        dist[at] = hasDist ? r.distanceMeters : hasDur ? 0 : UNREACHABLE;
+        const d = hasDur ? parseInt(r.duration) : hasDist ? 0 : NaN;
+        dur[at] = Number.isFinite(d) ? d : UNREACHABLE;
+        if (dist[at] !== UNREACHABLE && dur[at] !== UNREACHABLE) {
+          cachePair(pairKey(points[oi + i], points[di + j]), { dist: dist[at], dur: dur[at] });
+        }
+      }
+    };
+
+    // Fan the blocks out over a bounded worker pool so matrix build time is
+    // max-of-latencies rather than sum-of-latencies
+    try {
+      let nextBlock = 0;
+      await Promise.all(
+        Array.from({ length: Math.min(MATRIX_CONCURRENCY, blocks.length) }, async () => {
+          while (nextBlock < blocks.length) {
+            await fetchBlock(blocks[nextBlock++]);
+          }
+        })
+      );
+    } catch (e) {
+      return new Response(JSON.stringify({ error: 'Routes API failed', detail: String((e as any)?.message ?? e) }), {
         status: 502, headers: { ...corsHeaders, 'Content-Type': 'application/json' },
       });
     }
 
-    const rows = await resp.json();
-    const n = points.length;
-    const dist: number[][] = Array.from({ length: n }, () => Array(n).fill(Infinity));
-    const dur: number[][] = Array.from({ length: n }, () => Array(n).fill(Infinity));
-    for (const r of rows) {
-      const i = r.originIndex, j = r.destinationIndex;
-      if (typeof i !== 'number' || typeof j !== 'number') continue;
-      dist[i][j] = r.distanceMeters ?? Infinity;
-      // duration is "123s"
-      const d = typeof r.duration === 'string' ? parseInt(r.duration) : 0;
-      dur[i][j] = Number.isFinite(d) ? d : Infinity;
+    // Mirror across the diagonal to fill whichever direction wasn't fetched
+    if (symmetric) {
+      for (let i = 0; i < n; i++) {
+        for (let j = i + 1; j < n; j++) {
+          if (dur[j * n + i] === UNREACHABLE && dur[i * n + j] !== UNREACHABLE) {
+            dur[j * n + i] = dur[i * n + j];
+            dist[j * n + i] = dist[i * n + j];
+          } else if (dur[i * n + j] === UNREACHABLE && dur[j * n + i] !== UNREACHABLE) {
+            dur[i * n + j] = dur[j * n + i];
+            dist[i * n + j] = dist[j * n + i];
+          }
+        }
+      }
     }
 
-    // Nearest-neighbour from origin (index 0)
+    // Nearest-neighbour from origin (index 0). tourDur tracks the running
+    // tour duration so it never has to be recomputed from the matrix.
     const visited = new Set<number>([0]);
     const order: number[] = [0];
+    let tourDur = 0;
     let cur = 0;
     while (visited.size < n) {
-      let best = -1, bestD = Infinity;
+      let best = -1, bestD = UNREACHABLE;
       for (let j = 1; j < n; j++) {
         if (visited.has(j)) continue;
-        if (dur[cur][j] < bestD) { bestD = dur[cur][j]; best = j; }
+        if (dur[cur * n + j] < bestD) { bestD = dur[cur * n + j]; best = j; }
       }
       if (best === -1) break;
       visited.add(best); order.push(best); cur = best;
+      tourDur += bestD;
     }
 
-    // 2-opt improvement
-    const tourCost = (t: number[]) => {
-      let c = 0;
-      for (let i = 0; i < t.length - 1; i++) c += dur[t[i]][t[i + 1]];
-      return c;
-    };
-    let improved = true;
-    let iters = 0;
-    while (improved && iters < 50) {
-      improved = false; iters++;
+    // Local search: 2-opt sweeps (uncross the tour) alternated with Or-opt
+    // steps (relocate short runs of stops, which 2-opt cannot do), under a
+    // wall-clock budget that scales with instance size. Every accepted move
+    // strictly improves the tour by more than 1s, so the search terminates
+    // even without the budget.
+    const deadline = Date.now() + Math.min(10_000, Math.max(1_000, n * 50));
+
+    // Each candidate 2-opt move is scored by an O(segment) delta instead of
+    // recomputing the full tour cost twice, and applied by reversing in place
+    const twoOptSweep = (): boolean => {
+      let changed = false;
       for (let i = 1; i < order.length - 2; i++) {
         for (let k = i + 1; k < order.length - 1; k++) {
-          const newT = order.slice(0, i).concat(order.slice(i, k + 1).reverse(), order.slice(k + 1));
-          if (tourCost(newT) + 1 < tourCost(order)) { order.splice(0, order.length, ...newT); improved = true; }
+          const a = order[i - 1], b = order[i], c = order[k], d = order[k + 1];
+          let delta = dur[a * n + c] + dur[b * n + d] - dur[a * n + b] - dur[c * n + d];
+          // Reversing the segment flips its internal arcs, which matters for
+          // asymmetric (traffic-aware) durations
+          for (let t = i; t < k; t++) delta += dur[order[t + 1] * n + order[t]] - dur[order[t] * n + order[t + 1]];
+          if (delta < -1) {
+            for (let lo = i, hi = k; lo < hi; lo++, hi--) {
+              const tmp = order[lo]; order[lo] = order[hi]; order[hi] = tmp;
+            }
+            tourDur += delta;
+            changed = true;
+          }
         }
       }
+      return changed;
+    };
+
+    // Move one run of 1-3 stops to its best position; first improvement wins
+    const orOptStep = (): boolean => {
+      const len = order.length;
+      for (let L = 1; L <= 3; L++) {
+        for (let i = 1; i + L - 1 <= len - 2; i++) {
+          const e = i + L - 1;
+          const prev = order[i - 1], head = order[i], tail = order[e], next = order[e + 1];
+          const removeDelta = dur[prev * n + next] - dur[prev * n + head] - dur[tail * n + next];
+          for (let j = 0; j <= len - 1; j++) {
+            if (j >= i - 1 && j <= e) continue;
+            const x = order[j];
+            // j === len - 1 appends after the final stop (open tour: the
+            // relocated tail gains no outgoing arc)
+            const insDelta = j === len - 1
+              ? dur[x * n + head]
+              : dur[x * n + head] + dur[tail * n + order[j + 1]] - dur[x * n + order[j + 1]];
+            if (removeDelta + insDelta < -1) {
+              const seg = order.splice(i, L);
+              order.splice(j < i ? j + 1 : j + 1 - L, 0, ...seg);
+              tourDur += removeDelta + insDelta;
+              return true;
+            }
+          }
+        }
+      }
+      return false;
+    };
+
+    let improving = true;
+    while (improving && Date.now() < deadline) {
+      improving = twoOptSweep();
+      while (Date.now() < deadline && orOptStep()) improving = true;
     }
 
-    // Build response — strip origin
-    let totalDist = 0, totalDur = 0;
+    // Build response — strip origin. Duration comes from the incrementally
+    // maintained tour cost; only distance needs a walk over the final order.
+    let totalDist = 0;
+    const totalDur = tourDur;
     for (let i = 0; i < order.length - 1; i++) {
-      totalDist += dist[order[i]][order[i + 1]];
-      totalDur += dur[order[i]][order[i + 1]];
+      totalDist += dist[order[i] * n + order[i + 1]];
+    }
+    const sequenced: { stop_id: string; sequence: number }[] = [];
+    for (const idx of order.slice(1)) {
+      for (const stopId of stopIdsByPoint[idx]) {
+        sequenced.push({ stop_id: stopId, sequence: sequenced.length + 1 });
+      }
     }
-    const sequenced = order.slice(1).map((idx, sequence) => ({
-      stop_id: points[idx].id,
-      sequence: sequence + 1,
-    }));
 
     return new Response(JSON.stringify({
       sequence: sequenced,
@@ -448,7 +448,9 @@ Deno.serve(async (req) => {
           captureException(contactError)
         }
 
-        // Emails
+        // Emails and Shipday job creation are independent of each other —
+        // fire them concurrently instead of awaiting each in sequence
+        const emailWork = (async () => {
         try {
           const { data: userProfile } = await supabase
             .from('profiles')
@@ -458,8 +460,10 @@ Deno.serve(async (req) => {
           const userName = userProfile?.name || userProfile?.email || 'Customer'
           const userEmail = userProfile?.email
 
+          const sends: Promise<unknown>[] = []
+
           if (userEmail) {
-            await supabase.functions.invoke('send-email', {
+            sends.push(supabase.functions.invoke('send-email', {
               body: {
                 to: userEmail,
                 subject: 'Your Order Has Been Created - The Cycle Courier Co.',
@@ -482,11 +486,11 @@ Deno.serve(async (req) => {
           `,
                 from: 'Ccc@notification.cyclecourierco.com'
               }
-            })
+            }))
           }
 
           if (body.sender?.email) {
-            await supabase.functions.invoke('send-email', {
+            sends.push(supabase.functions.invoke('send-email', {
               body: {
                 to: body.sender.email,
                 emailType: 'sender',
@@ -495,11 +499,11 @@ Deno.serve(async (req) => {
                 item: { name: `${bikeBrand} ${bikeModel}`.trim(), quantity: body.bikeQuantity || body.bike_quantity || 1 },
                 baseUrl: 'https://booking.cyclecourierco.com'
               }
-            })
+            }))
           }
 
           if (body.receiver?.email) {
-            await supabase.functions.invoke('send-email', {
+            sends.push(supabase.functions.invoke('send-email', {
               body: {
                 to: body.receiver.email,
                 subject: 'Your Bicycle Delivery - The Cycle Courier Co.',
@@ -526,14 +530,18 @@ Deno.serve(async (req) => {
           `,
                 from: 'Ccc@notification.cyclecourierco.com'
               }
-            })
+            }))
           }
+
+          await Promise.all(sends)
         } catch (emailError) {
           console.error('Background email sending failed:', emailError)
           captureException(emailError)
         }
+        })()
 
         // Shipday
+        const shipdayWork = (async () => {
         try {
           const shipdayResponse = await supabase.functions.invoke('create-shipday-order', {
             body: { orderId: order.id }
@@ -545,6 +553,9 @@ Deno.serve(async (req) => {
           console.error('Error creating Shipday jobs:', shipdayError)
           captureException(shipdayError)
         }
+        })()
+
+        await Promise.all([emailWork, shipdayWork])
       })()
 
       // @ts-ignore EdgeRuntime is provided by Supabase Edge Runtime
@@ -203,6 +203,11 @@ serve(async (req) => {
     const dateEnd = new Date(date_range_end);
     let skippedCount = 0;
 
+    // Hoisted out of the order loop: the weekday list and "now" are the
+    // same for every stop, and generateAllWeekdays walks the whole range
+    const weekdays = generateAllWeekdays(dateStart, dateEnd);
+    const nowMs = Date.now();
+
     for (const order of orders) {
       const sender = order.sender as any;
       const receiver = order.receiver as any;
@@ -227,7 +232,7 @@ serve(async (req) => {
 
       if (!include_no_dates && collectionFlexible && deliveryFlexible) continue;
 
-      const ageInDays = Math.floor((Date.now() - new Date(order.created_at).getTime()) / (1000 * 60 * 60 * 24));
+      const ageInDays = Math.floor((nowMs - new Date(order.created_at).getTime()) / (1000 * 60 * 60 * 24));
       const priority = Math.min(ageInDays, 100);
 
       const isCollected = order.collection_confirmation_sent_at || order.order_collected || ['collected', 'driver_to_delivery'].includes(order.status);
@@ -245,7 +250,7 @@ serve(async (req) => {
           contact_name: sender?.name || 'Unknown',
           address: formatAddress(sender),
           phone: sender?.phone || '',
-          allowed_dates: collectionFlexible ? generateAllWeekdays(dateStart, dateEnd) : collectionDates,
+          allowed_dates: collectionFlexible ? weekdays : collectionDates,
           priority,
           dependency_group: order.id,
           date_flexible: collectionFlexible,
@@ -265,7 +270,7 @@ serve(async (req) => {
           contact_name: receiver?.name || 'Unknown',
           address: formatAddress(receiver),
           phone: receiver?.phone || '',
-          allowed_dates: deliveryFlexible ? generateAllWeekdays(dateStart, dateEnd) : deliveryDates,
+          allowed_dates: deliveryFlexible ? weekdays : deliveryDates,
           priority,
           dependency_group: order.id,
           date_flexible: deliveryFlexible,
@@ -302,8 +307,6 @@ serve(async (req) => {
     let aiTokensUsed = 0;
     let unassignedStops: Stop[] = [];
 
-    const weekdays = generateAllWeekdays(dateStart, dateEnd);
-
     if (LOVABLE_API_KEY && candidateGroups.length > 0) {
       try {
         const groupSummaries = candidateGroups.map((g, i) => ({
@@ -546,6 +549,14 @@ Use the assign_groups tool. Every group should ideally be assigned, but you may
       console.log(`${day}: ${slotSummary}`);
     }
 
+    // Serialized once and reused for both the prediction row and the response
+    const unassignedPayload = unassignedStops.map(s => ({
+      stop_id: s.id, order_id: s.order_id, type: s.type,
+      contact_name: s.contact_name, address: s.address,
+      postcode_prefix: s.postcode_prefix, region: s.region,
+      lat: s.lat, lon: s.lon,
+    }));
+
     // Save prediction
     const { data: prediction, error: predError } = await supabase
       .from('route_predictions')
@@ -559,12 +570,7 @@ Use the assign_groups tool. Every group should ideally be assigned, but you may
         ai_proposed_routes: aiProposedRoutes,
         validated_routes: validatedRoutes,
         planning_mode: 'v2',
-        unassigned_stops: unassignedStops.map(s => ({
-          stop_id: s.id, order_id: s.order_id, type: s.type,
-          contact_name: s.contact_name, address: s.address,
-          postcode_prefix: s.postcode_prefix, region: s.region,
-          lat: s.lat, lon: s.lon,
-        })),
+        unassigned_stops: unassignedPayload,
         status: 'draft',
       })
       .select()
@@ -623,12 +629,7 @@ Use the assign_groups tool. Every group should ideally be assigned, but you may
         },
         ai_tokens_used: aiTokensUsed,
         planning_mode: 'v2',
-        unassigned_stops: unassignedStops.map(s => ({
-          stop_id: s.id, order_id: s.order_id, type: s.type,
-          contact_name: s.contact_name, address: s.address,
-          postcode_prefix: s.postcode_prefix, region: s.region,
-          lat: s.lat, lon: s.lon,
-        })),
+        unassigned_stops: unassignedPayload,
       }),
       { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
     );